@@ -1,12 +1,11 @@
 # app.py
 import streamlit as st
-import pandas as pd
+import streamlit.components.v1 as components
 import numpy as np
 from datetime import datetime
 from simulation import simulate_impact, apply_kinetic_impactor, apply_nuclear_deflection, apply_fragmentation
-from utils import (estimate_population_affected, results_to_dataframe,
+from utils import (estimate_population_affected_arr, results_to_row,
                    create_folium_map, export_results_csv, export_results_json, SAMPLE_COUNTRY_DENSITY)
-from streamlit_folium import folium_static
 
 # APP CONFIG
 st.set_page_config(page_title="Asteroid Impact Digital Twin", layout="wide", initial_sidebar_state="expanded")
@@ -14,16 +13,7 @@ st.set_page_config(page_title="Asteroid Impact Digital Twin", layout="wide", ini
 import base64
 from pathlib import Path
 
-# Encode the logo to base64 so Streamlit always finds it
-def get_base64_image(image_path):
-    img_bytes = Path(image_path).read_bytes()
-    encoded = base64.b64encode(img_bytes).decode()
-    return f"data:image/png;base64,{encoded}"
-
-logo_data = get_base64_image("logo.png")
-
-st.markdown(
-    f"""
+HEADER_HTML_TEMPLATE = """
     <style>
         .header-container {{
             display: flex;
@@ -47,9 +37,20 @@ st.markdown(
         <img src="{logo_data}" alt="Logo">
         <h1>Asteroid Impact Digital Twin — NASA Space Apps Challenge 2025</h1>
     </div>
-    """,
-    unsafe_allow_html=True
-)
+    """
+
+# Encode the logo to base64 so Streamlit always finds it (computed once, not on every rerun)
+@st.cache_resource
+def get_base64_image(image_path):
+    img_bytes = Path(image_path).read_bytes()
+    encoded = base64.b64encode(img_bytes).decode()
+    return f"data:image/png;base64,{encoded}"
+
+@st.cache_resource
+def get_header_html(image_path):
+    return HEADER_HTML_TEMPLATE.format(logo_data=get_base64_image(image_path))
+
+st.markdown(get_header_html("logo.png"), unsafe_allow_html=True)
 
 
 # --- Sidebar: Project Info / Inputs / Mitigation selection ---
@@ -118,24 +119,47 @@ with col2:
     elif mitigation_choice == "Fragmentation (split)":
         st.write(f"Fragments: {frag_count}")
 
+# Cached simulation wrappers: "before" depends only on the asteroid inputs and "after" only on
+# the before-inputs plus mitigation, so changing mitigation alone skips the impact re-simulation
+@st.cache_data(max_entries=256, show_spinner=False)
+def run_before(diameter_m, velocity_m_s, density_kg_m3, impact_angle_deg, lat, lon):
+    return simulate_impact(diameter_m, velocity_m_s, density_kg_m3=density_kg_m3,
+                           impact_angle_deg=impact_angle_deg, lat=lat, lon=lon)
+
+# Mitigation helpers only read sim_result['input'], so key the cache on that sub-dict as a tuple
+@st.cache_data(max_entries=256, show_spinner=False)
+def run_after(before_input, strategy, param):
+    sim_before = {'input': dict(before_input)}
+    if strategy == "Kinetic Impactor (reduce velocity %)":
+        return apply_kinetic_impactor(sim_before, velocity_reduction_pct=param)
+    elif strategy == "Nuclear (reduce energy %)":
+        return apply_nuclear_deflection(sim_before, energy_reduction_pct=param)
+    elif strategy == "Fragmentation (split)":
+        return apply_fragmentation(sim_before, fragment_count=param)
+    return None
+
 # Run simulation if user clicks
 if run_button:
+    import pandas as pd  # imported lazily: only needed once results are displayed
+
     with st.spinner("Running simulation..."):
         # Convert velocity from km/s to m/s
         velocity_m_s = float(velocity) * 1000.0
-        sim_before = simulate_impact(diameter, velocity_m_s, density_kg_m3=density, impact_angle_deg=angle, lat=lat, lon=lon)
+        sim_before = run_before(diameter, velocity_m_s, density, angle, lat, lon)
 
         # apply mitigation if any
-        if mitigation_choice == "None":
-            sim_after = None
-        elif mitigation_choice == "Kinetic Impactor (reduce velocity %)":
-            sim_after = apply_kinetic_impactor(sim_before, velocity_reduction_pct=kin_reduce)
+        if mitigation_choice == "Kinetic Impactor (reduce velocity %)":
+            mitigation_param = kin_reduce
         elif mitigation_choice == "Nuclear (reduce energy %)":
-            sim_after = apply_nuclear_deflection(sim_before, energy_reduction_pct=nuc_reduce)
+            mitigation_param = nuc_reduce
         elif mitigation_choice == "Fragmentation (split)":
-            sim_after = apply_fragmentation(sim_before, fragment_count=frag_count)
+            mitigation_param = frag_count
         else:
-            sim_after = None
+            mitigation_param = None
+        sim_after = run_after(tuple(sim_before['input'].items()), mitigation_choice, mitigation_param)
+
+    # Population affected per zone (lethal, severe, moderate), computed once for all zones
+    pop_before = estimate_population_affected_arr(sim_before['areas_arr'], population_density)
 
     # Display summary cards
     st.markdown("## Results Summary")
@@ -144,42 +168,40 @@ if run_button:
     c2.metric("Crater diameter (m)", f"{sim_before['crater_diameter_m']:.1f}")
     c3.metric("Lethal radius (km)", f"{sim_before['damage_radii_m']['lethal_m']/1000.0:.2f}")
     c4.metric("Estimated affected pop (lethal zone)", 
-              f"{estimate_population_affected(sim_before['affected_areas_km2']['lethal_m'], population_density):.0f}"
+              f"{pop_before[0]:.0f}"
               if sim_before['affected_areas_km2']['lethal_m'] else "0")
 
+    # Build the results table once from plain row dicts
+    rows = [results_to_row(sim_before, label="before")]
+    if sim_after is not None:
+        rows.append(results_to_row(sim_after, label="after"))
+    df_all = pd.DataFrame(rows)
+
     st.markdown("### Detailed numeric results (Before)")
-    df_before = results_to_dataframe(sim_before, label="before")
-    st.dataframe(df_before, height=220)
+    st.dataframe(df_all.iloc[[0]], height=220)
 
     if sim_after is not None:
         st.markdown("### Detailed numeric results (After mitigation)")
-        df_after = results_to_dataframe(sim_after, label="after")
-        st.dataframe(df_after, height=220)
+        st.dataframe(df_all.iloc[[1]], height=220)
 
-    # Prepare CSV/JSON export
-    if sim_after is None:
-        df_all = df_before
-        json_blob = [sim_before]
-    else:
-        df_all = pd.concat([df_before, df_after], ignore_index=True)
-        json_blob = [sim_before, sim_after]
+    # Prepare JSON export
+    json_blob = [sim_before] if sim_after is None else [sim_before, sim_after]
 
-    # Export buttons
-    st.download_button("Download results CSV", data=export_results_csv(df_all), file_name=f"impact_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv", mime="text/csv")
-    st.download_button("Download results JSON", data=export_results_json(json_blob), file_name=f"impact_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json", mime="application/json")
+    # Export buttons (one timestamp so both files share the same name)
+    ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+    st.download_button("Download results CSV", data=export_results_csv(rows), file_name=f"impact_results_{ts}.csv", mime="text/csv")
+    st.download_button("Download results JSON", data=export_results_json(json_blob), file_name=f"impact_results_{ts}.json", mime="application/json")
 
     # Map visualization: show both before and after side-by-side
     st.markdown("## Map visualization")
     map_col1, map_col2 = st.columns(2)
     with map_col1:
         st.markdown("**Before**")
-        folium_map_before = create_folium_map(sim_before)
-        folium_static(folium_map_before, width=700, height=450)
+        components.html(create_folium_map(sim_before), width=700, height=450)
     with map_col2:
         st.markdown("**After**")
         if sim_after is not None:
-            folium_map_after = create_folium_map(sim_after)
-            folium_static(folium_map_after, width=700, height=450)
+            components.html(create_folium_map(sim_after), width=700, height=450)
         else:
             st.info("No mitigation selected; after-map would be identical to before.")
 
@@ -188,24 +210,18 @@ if run_button:
     comp_col1, comp_col2 = st.columns(2)
     with comp_col1:
         st.write("Radius comparison (m)")
-        comp_df = pd.DataFrame({
-            'zone': ['lethal', 'severe', 'moderate'],
-            'before_m': [sim_before['damage_radii_m']['lethal_m'], sim_before['damage_radii_m']['severe_m'], sim_before['damage_radii_m']['moderate_m']],
-            'after_m': [sim_after['damage_radii_m']['lethal_m'] if sim_after else None,
-                        sim_after['damage_radii_m']['severe_m'] if sim_after else None,
-                        sim_after['damage_radii_m']['moderate_m'] if sim_after else None]
-        })
-        st.bar_chart(comp_df.set_index('zone'))
+        after_radii = sim_after['radii_arr'] if sim_after else np.full(3, np.nan)
+        comp_df = pd.DataFrame(np.vstack([sim_before['radii_arr'], after_radii]).T,
+                               index=pd.Index(['lethal', 'severe', 'moderate'], name='zone'),
+                               columns=['before_m', 'after_m'])
+        st.bar_chart(comp_df)
     with comp_col2:
         st.write("Population affected (estimate)")
-        pop_before = {k: estimate_population_affected(sim_before['affected_areas_km2'][k], population_density) for k in sim_before['affected_areas_km2']}
-        pop_after = {k: estimate_population_affected(sim_after['affected_areas_km2'][k], population_density) if sim_after else None for k in sim_before['affected_areas_km2']}
-        pop_df = pd.DataFrame({
-            'zone': list(pop_before.keys()),
-            'before': list(pop_before.values()),
-            'after': list(pop_after.values()) if sim_after else None
-        })
-        st.bar_chart(pop_df.set_index('zone'))
+        pop_after = estimate_population_affected_arr(sim_after['areas_arr'], population_density) if sim_after else np.full(3, np.nan)
+        pop_df = pd.DataFrame(np.vstack([pop_before, pop_after]).T,
+                              index=pd.Index(['lethal', 'severe', 'moderate'], name='zone'),
+                              columns=['before', 'after'])
+        st.bar_chart(pop_df)
 
     st.success("Simulation complete — use downloads to save results.")
 
@@ -19,30 +19,64 @@ Outputs:
  - final_crater_diameter_m (approx)
  - damage_radii_m: dict of different severity radii
  - affected_area_km2 (for each radius)
+ - radii_arr / areas_arr: the same radii and areas as arrays ordered (lethal, severe, moderate)
 """
 
 import math
 import numpy as np
 
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; fall back to plain Python
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
 # constants
 JOULES_PER_MEGATON_TNT = 4.184e15
 EARTH_GRAVITY = 9.81  # m/s^2
 EARTH_RADIUS_M = 6371000.0
+TARGET_DENSITY_KG_M3 = 2500.0  # typical crustal rock
+
+# folded constants (multiply instead of divide in the hot path)
+_INV_J_PER_MT = 1.0 / JOULES_PER_MEGATON_TNT
+_FOUR_THIRDS_PI = (4.0/3.0) * math.pi
+_LOG_RHO_T_OVER_9 = math.log(TARGET_DENSITY_KG_M3) / 9.0
+
+# sin(angle)^(1/3) for whole degrees 0..90 (the app's angle slider is integer-valued)
+_ANGLE_FACTOR = np.sin(np.deg2rad(np.arange(91))) ** (1/3)
 
 def mass_from_diameter(diameter_m, density_kg_m3=3000.0):
     """Mass of a sphere (asteroid) in kg."""
-    r = diameter_m / 2.0
-    volume = (4.0/3.0) * math.pi * r**3
-    return density_kg_m3 * volume
+    r = diameter_m * 0.5
+    return density_kg_m3 * _FOUR_THIRDS_PI * r*r*r
 
 def kinetic_energy_joules(mass_kg, velocity_m_s):
     """Kinetic energy in joules."""
     return 0.5 * mass_kg * velocity_m_s**2
 
 def energy_megatons(energy_joules):
-    return energy_joules / JOULES_PER_MEGATON_TNT
-
-def estimate_crater_diameter(energy_joules, density_impactor=3000.0, density_target=2500.0, impact_angle_deg=45.0):
+    return energy_joules * _INV_J_PER_MT
+
+@njit(cache=True)
+def _angle_factor(impact_angle_deg):
+    """Impact angle factor sin(angle)^(1/3); whole degrees are read from a lookup table."""
+    idx = int(impact_angle_deg)
+    if idx == impact_angle_deg and 0 <= idx <= 90:
+        return float(_ANGLE_FACTOR[idx])
+    return math.sin(math.radians(impact_angle_deg)) ** (1.0/3.0)
+
+@njit(cache=True)
+def _density_factor(density_impactor, density_target):
+    """(density_impactor/density_target)^(1/9); computed in log space for the default target density."""
+    if density_target == TARGET_DENSITY_KG_M3:
+        return math.exp(math.log(density_impactor) / 9.0 - _LOG_RHO_T_OVER_9)
+    return (density_impactor / density_target) ** (1.0/9.0)
+
+def estimate_crater_diameter(energy_joules, density_impactor=3000.0, density_target=TARGET_DENSITY_KG_M3, impact_angle_deg=45.0):
     """
     Empirical approximation for crater diameter.
     This uses a simplified scaling law; not intended to replace specialized impact models.
@@ -51,10 +85,10 @@ def estimate_crater_diameter(energy_joules, density_impactor=3000.0, density_tar
     # Convert to a physically plausible scaling using a power law.
     # Choose a constant to bring outputs to realistic magnitude; tuned for demo.
     E = energy_joules
-    angle_factor = math.sin(math.radians(impact_angle_deg)) ** (1/3)  # shallow impacts make slightly smaller craters
+    angle_factor = _angle_factor(impact_angle_deg)  # shallow impacts make slightly smaller craters
     # empirical scaling: D (m) ~ C * E^(1/4)
     C = 0.035  # tuned coefficient for meters (empirical)
-    crater_diameter_m = C * (E ** 0.25) * angle_factor * (density_impactor/density_target)**(1/9)
+    crater_diameter_m = C * (E ** 0.25) * angle_factor * _density_factor(density_impactor, density_target)
     # ensure minimum scale ~ few meters for tiny meteors
     return max(1.0, crater_diameter_m)
 
@@ -66,20 +100,13 @@ def estimate_damage_radii(energy_joules):
     - moderate_radius: moderate damage / broken windows
     Scaling chosen as power law approximations.
     """
-    # energy scale in megatons
-    E_mt = energy_megatons(energy_joules)
-    if E_mt <= 0:
-        return {'lethal_m': 0.0, 'severe_m': 0.0, 'moderate_m': 0.0}
-    # Use empirical power laws (tuned for demo):
-    lethal_m = 1000.0 * (E_mt ** (1/3))        # km-scale for very large energies
-    severe_m  = 2000.0 * (E_mt ** (1/3)) * 0.6
-    moderate_m = 3000.0 * (E_mt ** (1/3)) * 1.2
-    # The above produce meters when E_mt small/large; adjust for tiny impacts
-    # Clamp and scale down for small energies
+    # energy scale in megatons; one cube root shared by all zones (clamped so no branch is needed)
+    base = max(0.0, energy_megatons(energy_joules)) ** (1/3)
+    # Empirical power laws (tuned for demo), with minimum radii for tiny impacts
     return {
-        'lethal_m': max(5.0, lethal_m),
-        'severe_m': max(10.0, severe_m),
-        'moderate_m': max(20.0, moderate_m)
+        'lethal_m': max(5.0, 1000.0 * base),
+        'severe_m': max(10.0, 1200.0 * base),
+        'moderate_m': max(20.0, 3600.0 * base)
     }
 
 def area_from_radius_m(radius_m):
@@ -87,15 +114,32 @@ def area_from_radius_m(radius_m):
     area_m2 = math.pi * (radius_m ** 2)
     return area_m2 / 1e6
 
+@njit(cache=True, fastmath=True)
+def _simulate_core(d, v, rho_i, rho_t, ang):
+    """
+    Fused scalar kernel of the helpers above (mass, energy, crater, damage radii).
+    Returns (mass_kg, energy_joules, energy_megatons, crater_diameter_m, lethal_m, severe_m, moderate_m).
+    """
+    r = d * 0.5
+    m = rho_i * _FOUR_THIRDS_PI * r * r * r
+    E = 0.5 * m * v * v
+    E_mt = E * _INV_J_PER_MT
+    angle_factor = _angle_factor(ang)
+    crater_d = max(1.0, 0.035 * E ** 0.25 * angle_factor * _density_factor(rho_i, rho_t))
+    base = max(0.0, E_mt) ** (1.0/3.0)
+    return m, E, E_mt, crater_d, max(5.0, 1000.0 * base), max(10.0, 1200.0 * base), max(20.0, 3600.0 * base)
+
+# pre-warm the JIT at import so the first simulation doesn't pay the compile cost
+_simulate_core(1.0, 1.0, 3000.0, TARGET_DENSITY_KG_M3, 45.0)
+
 def simulate_impact(diameter_m, velocity_m_s, density_kg_m3=3000.0, impact_angle_deg=45.0, lat=None, lon=None):
     """
     Main simulation function. Returns a dictionary with physics outputs.
     """
-    m = mass_from_diameter(diameter_m, density_kg_m3)
-    E = kinetic_energy_joules(m, velocity_m_s)
-    E_mt = energy_megatons(E)
-    crater_d = estimate_crater_diameter(E, density_impactor=density_kg_m3, impact_angle_deg=impact_angle_deg)
-    damage_radii = estimate_damage_radii(E)
+    # cast to float so the JIT kernel is compiled for a single signature
+    m, E, E_mt, crater_d, lethal_m, severe_m, moderate_m = _simulate_core(
+        float(diameter_m), float(velocity_m_s), float(density_kg_m3), TARGET_DENSITY_KG_M3, float(impact_angle_deg))
+    damage_radii = {'lethal_m': lethal_m, 'severe_m': severe_m, 'moderate_m': moderate_m}
     areas_km2 = {k: area_from_radius_m(v) for k, v in damage_radii.items()}
 
     # Package results
@@ -115,8 +159,61 @@ def simulate_impact(diameter_m, velocity_m_s, density_kg_m3=3000.0, impact_angle
         'damage_radii_m': damage_radii,
         'affected_areas_km2': areas_km2
     }
+    # SoA view of the zones in fixed order (lethal, severe, moderate) for vectorized comparisons
+    out['radii_arr'] = np.array([lethal_m, severe_m, moderate_m])
+    out['areas_arr'] = out['radii_arr']**2 * (math.pi/1e6)
     return out
 
+def simulate_impact_batch(diameter_m, velocity_m_s, density_kg_m3=3000.0, impact_angle_deg=45.0):
+    """
+    Vectorized simulate_impact for parameter sweeps (sensitivity analysis, Monte-Carlo).
+    Inputs may be scalars or NumPy arrays and are broadcast against each other.
+    Returns a dictionary of arrays with the same keys as the scalar outputs.
+    """
+    d = np.asarray(diameter_m, dtype=np.float64)
+    v = np.asarray(velocity_m_s, dtype=np.float64)
+    rho = np.asarray(density_kg_m3, dtype=np.float64)
+    ang = np.asarray(impact_angle_deg, dtype=np.float64)
+
+    m = rho * _FOUR_THIRDS_PI * (d * 0.5)**3
+    E = 0.5 * m * v**2
+    E_mt = E * _INV_J_PER_MT
+    angle_factor = np.sin(np.deg2rad(ang)) ** (1/3)
+    crater_d = np.fmax(1.0, 0.035 * E**0.25 * angle_factor * np.exp(np.log(rho) / 9.0 - _LOG_RHO_T_OVER_9))
+    base = np.cbrt(np.fmax(E_mt, 0.0))
+    damage_radii = {
+        'lethal_m': np.fmax(5.0, 1000.0 * base),
+        'severe_m': np.fmax(10.0, 1200.0 * base),
+        'moderate_m': np.fmax(20.0, 3600.0 * base)
+    }
+    areas_km2 = {k: np.pi * r**2 / 1e6 for k, r in damage_radii.items()}
+
+    return {
+        'mass_kg': m,
+        'energy_joules': E,
+        'energy_megatons': E_mt,
+        'crater_diameter_m': crater_d,
+        'damage_radii_m': damage_radii,
+        'affected_areas_km2': areas_km2
+    }
+
+@njit(parallel=True, cache=True, fastmath=True)
+def simulate_impact_batch_numba(d, v, rho, ang, out_E, out_crater, out_leth, out_sev, out_mod):
+    """
+    Parallel variant of simulate_impact_batch for large sweeps; samples are split across cores.
+    d, v, rho, ang are 1-D float64 arrays of equal length (SI units, angle in degrees).
+    Results are written into the caller-allocated out_* arrays of the same length.
+    """
+    for i in prange(d.shape[0]):
+        # _simulate_core is inlined by the JIT, so no temporary arrays are created
+        m, E, E_mt, crater_d, lethal_m, severe_m, moderate_m = _simulate_core(
+            d[i], v[i], rho[i], TARGET_DENSITY_KG_M3, ang[i])
+        out_E[i] = E
+        out_crater[i] = crater_d
+        out_leth[i] = lethal_m
+        out_sev[i] = severe_m
+        out_mod[i] = moderate_m
+
 # ---------------- Mitigation -----------------
 
 def apply_kinetic_impactor(sim_result, velocity_reduction_pct=10.0):
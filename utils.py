@@ -1,32 +1,57 @@
 # utils.py
+import copy
+import csv
+import io
 import json
 import math
-import pandas as pd
-from streamlit_folium import folium_static
-import folium
+from types import MappingProxyType
+import numpy as np
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to stdlib json
+    orjson = None
+import streamlit as st
 
-# small sample densities (people per km^2) for fallback if user doesn't provide population data
-SAMPLE_COUNTRY_DENSITY = {
-    "default": 60.0,  # global-ish average fallback
+_DEFAULT_DENSITY = 60.0  # global-ish average fallback
+
+# small sample densities (people per km^2) for fallback if user doesn't provide population data (read-only)
+SAMPLE_COUNTRY_DENSITY = MappingProxyType({
+    "default": _DEFAULT_DENSITY,
     "India": 464.0,
     "USA": 36.0,
     "China": 153.0,
     "Brazil": 25.0,
     "Australia": 3.2
-}
+})
 
 def estimate_population_affected(area_km2, population_density_per_km2=None):
     """
     Estimate population affected given area in km^2 and a population density.
     If population_density_per_km2 is None, use default.
     """
-    if population_density_per_km2 is None:
-        population_density_per_km2 = SAMPLE_COUNTRY_DENSITY['default']
-    return area_km2 * population_density_per_km2
+    return area_km2 * (population_density_per_km2 if population_density_per_km2 is not None else _DEFAULT_DENSITY)
+
+def estimate_population_affected_arr(areas_arr, population_density_per_km2=None):
+    """
+    Vectorized estimate_population_affected over an array of zone areas (km^2), e.g. sim_result['areas_arr'].
+    """
+    return np.asarray(areas_arr) * (population_density_per_km2 if population_density_per_km2 is not None
+                                    else _DEFAULT_DENSITY)
+
+# CSV export schema, in the order produced by results_to_row
+COLUMNS = [
+    'scenario', 'diameter_m', 'velocity_m_s', 'density_kg_m3', 'impact_angle_deg',
+    'mass_kg', 'energy_joules', 'energy_megatons', 'crater_diameter_m',
+    'lethal_m_radius_m', 'lethal_m_area_km2',
+    'severe_m_radius_m', 'severe_m_area_km2',
+    'moderate_m_radius_m', 'moderate_m_area_km2',
+    'lat', 'lon'
+]
 
-def results_to_dataframe(sim_result, label="before"):
+def results_to_row(sim_result, label="before"):
     """
-    Convert sim_result dict to pandas DataFrame row for export or display.
+    Flatten sim_result dict to a single row dict for export or display.
+    Build the DataFrame once at the display boundary rather than per row.
     """
     row = {}
     row['scenario'] = label
@@ -47,11 +72,78 @@ def results_to_dataframe(sim_result, label="before"):
     # location
     row['lat'] = inp.get('lat')
     row['lon'] = inp.get('lon')
-    return pd.DataFrame([row])
+    return row
+
+# Color mapping for damage zones
+ZONE_COLORS = {'lethal_m': '#800000', 'severe_m': '#FF4500', 'moderate_m': '#FFA500'}
+
+# damage circles are drawn as polygons with this many vertices
+CIRCLE_VERTICES = 64
+METERS_PER_DEGREE_LAT = 111320.0
+_THETA = np.linspace(0.0, 2.0 * np.pi, CIRCLE_VERTICES, endpoint=False)
+
+def _circle_feature(lat, lon, radius_m, color, fill_opacity, label):
+    """
+    GeoJSON polygon feature approximating a circle of radius_m (meters) around lat/lon.
+    """
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)  # avoid blow-up at the poles
+    lats = lat + radius_m / METERS_PER_DEGREE_LAT * np.cos(_THETA)
+    lons = lon + radius_m / (METERS_PER_DEGREE_LAT * cos_lat) * np.sin(_THETA)
+    ring = np.column_stack([lons, lats]).tolist()  # GeoJSON uses [lon, lat]
+    ring.append(ring[0])  # close the ring
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+        'properties': {'color': color, 'fill_opacity': fill_opacity, 'label': label}
+    }
+
+def _zone_style(feature):
+    props = feature['properties']
+    return {'color': props['color'], 'fillColor': props['color'],
+            'fillOpacity': props['fill_opacity'], 'weight': 3}
+
+@st.cache_resource(show_spinner=False)
+def _base_map(lat, lon, map_tiles, zoom_start):
+    """
+    Base folium map (tile layer only), shared by the before/after maps.
+    This object is shared across reruns and sessions: deep-copy it before adding layers.
+    """
+    import folium
+
+    return folium.Map(location=[lat, lon], tiles=map_tiles, zoom_start=zoom_start)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _build_map_html(lat, lon, zoom_start, lethal_m, severe_m, moderate_m, crater_radius,
+                    map_tiles='OpenStreetMap', popup=True):
+    """
+    Build the folium map with concentric damage circles and return it rendered as HTML.
+    Cached on the scalar inputs, so reruns with unchanged results skip the map rebuild.
+    """
+    import folium  # imported lazily: only needed on a cache miss, keeps app cold start fast
+
+    # deep copy: a shallow copy would share (and mutate) the cached base map's children
+    m = copy.deepcopy(_base_map(lat, lon, map_tiles, zoom_start))
+    damage = folium.FeatureGroup(name='Damage zones')
+    # Add impact marker
+    folium.CircleMarker([lat, lon], radius=5, color='black', fill=True, fill_color='black',
+                        popup="Impact Point" if popup else None).add_to(damage)
+    # Damage zones and crater go into a single GeoJSON layer (one Leaflet layer instead of one per circle)
+    radii = {'lethal_m': lethal_m, 'severe_m': severe_m, 'moderate_m': moderate_m}
+    features = [_circle_feature(lat, lon, radius_m, ZONE_COLORS.get(zone, '#3388ff'), 0.25,
+                                f"{zone}: {radius_m:.0f} m")
+                for zone, radius_m in radii.items()]
+    features.append(_circle_feature(lat, lon, crater_radius, 'black', 0.6,
+                                    f"Crater radius ~ {crater_radius:.1f} m"))
+    folium.GeoJson({'type': 'FeatureCollection', 'features': features},
+                   style_function=_zone_style,
+                   popup=folium.GeoJsonPopup(fields=['label'], labels=False) if popup else None).add_to(damage)
+    damage.add_to(m)
+    return m.get_root().render()
 
 def create_folium_map(sim_result, map_tiles='OpenStreetMap', popup=True):
     """
-    Create a folium map with concentric circles for damage zones.
+    Create a folium map with concentric circles for damage zones and return its HTML
+    (render with st.components.v1.html).
     If lat/lon is missing, we return a world map centered at (0,0).
     """
     lat = sim_result['input'].get('lat')
@@ -62,38 +154,31 @@ def create_folium_map(sim_result, map_tiles='OpenStreetMap', popup=True):
     else:
         zoom_start = 5
 
-    m = folium.Map(location=[lat, lon], tiles=map_tiles, zoom_start=zoom_start)
-    # Add impact marker
-    folium.CircleMarker([lat, lon], radius=5, color='black', fill=True, fill_color='black',
-                        popup="Impact Point" if popup else None).add_to(m)
-    # Color mapping
-    colors = {'lethal_m': '#800000', 'severe_m': '#FF4500', 'moderate_m': '#FFA500'}
-    for zone, radius_m in sim_result['damage_radii_m'].items():
-        # convert meters to kilometers for display but folium uses meters for radius
-        folium.Circle(location=[lat, lon],
-                      radius=radius_m,
-                      color=colors.get(zone, '#3388ff'),
-                      fill=True,
-                      fill_opacity=0.25,
-                      popup=f"{zone}: {radius_m:.0f} m" if popup else None).add_to(m)
-    # add crater marker/ellipse
+    radii = sim_result['damage_radii_m']
     crater_radius = max(1.0, sim_result['crater_diameter_m'] / 2.0)
-    folium.Circle(location=[lat, lon],
-                  radius=crater_radius,
-                  color='black',
-                  fill=True,
-                  fill_opacity=0.6,
-                  popup=f"Crater radius ~ {crater_radius:.1f} m" if popup else None).add_to(m)
-    return m
+    return _build_map_html(lat, lon, zoom_start, radii['lethal_m'], radii['severe_m'], radii['moderate_m'],
+                           crater_radius, map_tiles=map_tiles, popup=popup)
 
-def export_results_csv(df_all):
+def export_results_csv(rows):
     """
-    Returns CSV bytes for download.
+    Returns CSV bytes for download from a list of row dicts (see results_to_row).
     """
-    return df_all.to_csv(index=False).encode('utf-8')
+    sio = io.StringIO()
+    writer = csv.DictWriter(sio, fieldnames=COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return sio.getvalue().encode('utf-8')
+
+def _json_default(obj):
+    """Make NumPy values (e.g. radii_arr/areas_arr) JSON-serializable for the stdlib fallback."""
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
 def export_results_json(list_of_dicts):
     """
     Return json bytes.
     """
-    return json.dumps(list_of_dicts, indent=2).encode('utf-8')
+    if orjson is not None:
+        return orjson.dumps(list_of_dicts, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(list_of_dicts, indent=2, default=_json_default).encode('utf-8')